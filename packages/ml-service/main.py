@@ -1,5 +1,6 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
@@ -7,6 +8,8 @@ import os
 from dotenv import load_dotenv
 import logging
 import asyncio
+import numpy as np
+import cv2
 
 from services.detection_service import DiseaseDetectionService, DetectionResult
 
@@ -20,7 +23,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Leaf Disease Detection ML Service",
     description="Machine Learning service for leaf disease detection using U-Net",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -32,9 +36,158 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Upload limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_IMAGE_SIZE", 10 * 1024 * 1024))
+MAX_BATCH_FILES = 10
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Leading bytes of the accepted image formats
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n')
+
+def is_supported_image(header: bytes) -> bool:
+    """Check the first bytes of an upload for a JPEG, PNG or WebP signature"""
+    if header.startswith(IMAGE_SIGNATURES):
+        return True
+    return header[:4] == b'RIFF' and header[8:12] == b'WEBP'
+
+async def read_upload(file: UploadFile) -> bytes:
+    """
+    Read an uploaded image, rejecting oversized or non-image payloads before buffering them
+    
+    Args:
+        file: Uploaded image file
+        
+    Returns:
+        File content (empty if the upload was empty)
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds {MAX_UPLOAD_BYTES} bytes")
+    
+    header = await file.read(12)
+    if not header:
+        return header
+    if not is_supported_image(header):
+        raise HTTPException(status_code=400, detail=f"File {file.filename} is not a JPEG, PNG or WebP image")
+    
+    await file.seek(0)
+    image_data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(image_data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File {file.filename} exceeds {MAX_UPLOAD_BYTES} bytes")
+    return image_data
+
 # Initialize detection service
 detection_service = DiseaseDetectionService()
 
+class MicroBatcher:
+    """Coalesces concurrent single-image detections into batched service calls"""
+    
+    def __init__(self, service: DiseaseDetectionService, max_batch: int = 8,
+                 max_wait: float = 0.02, max_queue: int = 100):
+        """
+        Initialize micro-batcher
+        
+        Args:
+            service: Detection service used to run each batch
+            max_batch: Maximum number of images per batch
+            max_wait: Seconds to wait for a batch to fill after the first image arrives
+            max_queue: Maximum number of pending images before new requests are rejected
+        """
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    def submit(self, image_data: bytes) -> asyncio.Future:
+        """
+        Queue an image for detection
+        
+        Raises:
+            asyncio.QueueFull: If too many images are already pending
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queue and worker are bound to the loop they were created on
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        self._queue.put_nowait((image_data, future))
+        return future
+    
+    async def stop(self):
+        """Cancel the background batching task"""
+        if self._worker is not None and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch:
+                # A single sleep over the window, then take whatever arrived.
+                # wait_for(queue.get(), ...) can drop an item dequeued just as
+                # the timeout fires on older Pythons
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+            
+            await self._detect(batch)
+    
+    def _drain(self, batch: list):
+        """Move queued images into the batch without waiting, up to max_batch"""
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+    
+    async def _detect(self, batch: list):
+        """Run one batch and resolve each request's future with its own result or error"""
+        images = [image for image, _ in batch]
+        try:
+            results = await self.service.detect_diseases_batch(images)
+        except Exception as e:
+            logger.warning(f"Micro-batch detection failed, retrying images individually: {e}")
+            results = None
+        
+        if results is not None and len(results) != len(batch):
+            # Results can no longer be matched to their requests
+            logger.error(f"Micro-batch returned {len(results)} results for {len(batch)} images, "
+                         f"retrying images individually")
+            results = None
+        
+        if results is None:
+            # Requests share a batch only for throughput; one bad image must
+            # not fail the others
+            results = await asyncio.gather(
+                *(self.service.detect_disease(image) for image in images),
+                return_exceptions=True
+            )
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+batcher = MicroBatcher(
+    detection_service,
+    max_batch=int(os.getenv("BATCH_SIZE", 8)),
+    max_wait=float(os.getenv("BATCH_WINDOW_MS", 20)) / 1000.0
+)
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
@@ -54,6 +207,37 @@ class BatchDetectionResponse(BaseModel):
     total_images: int
     successful_detections: int
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject detection uploads whose declared size is too large before the body is read"""
+    if request.url.path == "/detect/batch":
+        limit = MAX_BATCH_FILES * MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    elif request.url.path == "/detect":
+        limit = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    else:
+        return await call_next(request)
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return ORJSONResponse(status_code=413, content={"detail": "Upload too large"})
+    
+    return await call_next(request)
+
+@app.on_event("startup")
+async def warmup():
+    """Run one dummy detection so first requests don't pay JIT, decoder and model warm-up costs"""
+    try:
+        dummy = np.zeros((256, 256, 3), dtype=np.uint8)
+        encoded = cv2.imencode(".jpg", dummy)[1].tobytes()
+        await detection_service.detect_disease(encoded)
+        logger.info("Detection pipeline warmed up")
+    except Exception as e:
+        logger.warning(f"Warm-up detection failed: {e}")
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     from datetime import datetime
@@ -84,13 +268,17 @@ async def detect_disease(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be an image")
         
         # Read file content
-        image_data = await file.read()
+        image_data = await read_upload(file)
         
         if len(image_data) == 0:
             raise HTTPException(status_code=400, detail="Empty file uploaded")
         
-        # Perform detection
-        result = await detection_service.detect_disease(image_data)
+        # Perform detection, batched together with concurrent requests
+        try:
+            future = batcher.submit(image_data)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Detection queue is full, please retry")
+        result = await future
         
         # Check for errors in result
         if "error" in result.metadata:
@@ -119,8 +307,8 @@ async def detect_diseases_batch(files: List[UploadFile] = File(...)):
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded")
         
-        if len(files) > 10:  # Limit batch size
-            raise HTTPException(status_code=400, detail="Maximum 10 files allowed per batch")
+        if len(files) > MAX_BATCH_FILES:  # Limit batch size
+            raise HTTPException(status_code=400, detail=f"Maximum {MAX_BATCH_FILES} files allowed per batch")
         
         # Read all file contents
         image_data_list = []
@@ -128,7 +316,7 @@ async def detect_diseases_batch(files: List[UploadFile] = File(...)):
             if not file.content_type or not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail=f"File {file.filename} must be an image")
             
-            image_data = await file.read()
+            image_data = await read_upload(file)
             if len(image_data) == 0:
                 raise HTTPException(status_code=400, detail=f"File {file.filename} is empty")
             
@@ -137,22 +325,15 @@ async def detect_diseases_batch(files: List[UploadFile] = File(...)):
         # Perform batch detection
         results = await detection_service.detect_diseases_batch(image_data_list)
         
-        # Convert results to response format
-        detection_responses = []
-        successful_count = 0
-        
-        for result in results:
-            detection_response = DetectionResponse(**result.to_dict())
-            detection_responses.append(detection_response)
-            
-            if "error" not in result.metadata:
-                successful_count += 1
+        # Serialize result dicts in a single orjson pass; returning the response
+        # directly skips re-validating every result against DetectionResponse
+        successful_count = sum(1 for result in results if "error" not in result.metadata)
         
-        return BatchDetectionResponse(
-            results=detection_responses,
-            total_images=len(files),
-            successful_detections=successful_count
-        )
+        return ORJSONResponse({
+            "results": [result.to_dict() for result in results],
+            "total_images": len(files),
+            "successful_detections": successful_count
+        })
         
     except HTTPException:
         raise
@@ -183,4 +364,5 @@ async def get_disease_classes():
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8001))
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", 1))
+    uvicorn.run("main:app", host=host, port=port, loop="uvloop", http="httptools", workers=workers)
\ No newline at end of file
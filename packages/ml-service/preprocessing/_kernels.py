@@ -0,0 +1,63 @@
+"""
+Numba kernels for the image preprocessing pipeline
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Numba is optional; ImageProcessor falls back to its OpenCV path
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+CONTRAST_FACTOR = 1.2
+SHARPNESS_FACTOR = 1.1
+
+
+@njit(inline='always')
+def _reflect_101(index: int, size: int) -> int:
+    """Mirror an out-of-range neighbour index like OpenCV's BORDER_REFLECT_101"""
+    if size == 1:
+        return 0
+    if index < 0:
+        return -index
+    if index >= size:
+        return 2 * size - index - 2
+    return index
+
+
+# Serial and GIL-free: images are already spread across a thread pool, and
+# Numba's parallel backend is not safe to enter from several threads at once
+@njit(nogil=True, fastmath=True, cache=True)
+def enhance_kernel(image: np.ndarray, out: np.ndarray) -> None:
+    """
+    Normalize, contrast-stretch and sharpen an RGB uint8 image in one pass
+
+    Sharpening blends each pixel with PIL's SMOOTH filter
+    (1.1 * pixel - 0.1 * smooth); contrast is stretched by 20% around 0.5.
+    Both are affine, so they are applied together to the raw values.
+
+    Args:
+        image: C-contiguous uint8 array of shape (height, width, channels)
+        out: float32 array of the same shape receiving values in [0, 1]
+    """
+    height, width, channels = image.shape
+    for y in range(height):
+        y_up = _reflect_101(y - 1, height)
+        y_down = _reflect_101(y + 1, height)
+        for x in range(width):
+            x_left = _reflect_101(x - 1, width)
+            x_right = _reflect_101(x + 1, width)
+            for c in range(channels):
+                center = np.float32(image[y, x, c])
+                neighbours = (np.float32(image[y_up, x_left, c]) + np.float32(image[y_up, x, c])
+                              + np.float32(image[y_up, x_right, c]) + np.float32(image[y, x_left, c])
+                              + np.float32(image[y, x_right, c]) + np.float32(image[y_down, x_left, c])
+                              + np.float32(image[y_down, x, c]) + np.float32(image[y_down, x_right, c]))
+                smooth = (5.0 * center + neighbours) / 13.0
+                value = (SHARPNESS_FACTOR * center - (SHARPNESS_FACTOR - 1.0) * smooth) / 255.0
+                value = (value - 0.5) * CONTRAST_FACTOR + 0.5
+                out[y, x, c] = min(max(value, 0.0), 1.0)
@@ -2,13 +2,123 @@
 Image preprocessing pipeline for leaf disease detection
 """
 import numpy as np
-from PIL import Image, ImageEnhance
+import cv2
+from PIL import Image
 import io
-from typing import Tuple, Union, Optional
+import os
+import struct
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable, Iterator, Tuple, Union, Optional
 import logging
 
+from preprocessing._kernels import NUMBA_AVAILABLE, enhance_kernel
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    # PyTurboJPEG is optional; fall back to OpenCV's decoder
+    _turbojpeg = None
+
 logger = logging.getLogger(__name__)
 
+JPEG_MAGIC = b'\xff\xd8\xff'
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+# Bytes read from disk when parsing image headers; large enough for typical EXIF blocks
+HEADER_PREFIX_SIZE = 64 * 1024
+
+# SOFn markers carry the frame size; 0xC4 (DHT), 0xC8 (JPG) and 0xCC (DAC) do not
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Sharpness enhancement (1.1 * image - 0.1 * PIL SMOOTH filter) folded into one 3x3 kernel
+_SMOOTH_KERNEL = np.array([[1, 1, 1],
+                           [1, 5, 1],
+                           [1, 1, 1]], dtype=np.float32) / 13.0
+_IDENTITY_KERNEL = np.zeros((3, 3), dtype=np.float32)
+_IDENTITY_KERNEL[1, 1] = 1.0
+_SHARPEN_KERNEL = np.ascontiguousarray(1.1 * _IDENTITY_KERNEL - 0.1 * _SMOOTH_KERNEL, dtype=np.float32)
+
+# PNG IHDR color type -> number of bands
+_PNG_COLOR_TYPE_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def _parse_jpeg_header(buf: bytes) -> Optional[Tuple[int, int, int]]:
+    """Read (width, height, channels) from the first JPEG SOF segment"""
+    offset = 2
+    end = len(buf)
+    while offset + 4 <= end:
+        if buf[offset] != 0xFF:
+            return None
+        marker = buf[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # Standalone markers
+            offset += 2
+            continue
+        segment_length, = struct.unpack_from('>H', buf, offset + 2)
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 10 > end:
+                return None
+            height, width, channels = struct.unpack_from('>HHB', buf, offset + 5)
+            return width, height, channels
+        offset += 2 + segment_length
+    return None
+
+def _parse_png_header(buf: bytes) -> Optional[Tuple[int, int, int]]:
+    """Read (width, height, channels) from the PNG IHDR chunk"""
+    if len(buf) < 26 or buf[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack_from('>II', buf, 16)
+    channels = _PNG_COLOR_TYPE_CHANNELS.get(buf[25])
+    if channels is None:
+        return None
+    return width, height, channels
+
+def _parse_image_header(buf: bytes) -> Optional[Tuple[int, int, int, str]]:
+    """Read (width, height, channels, format) from a JPEG or PNG header without decoding"""
+    if buf[:3] == JPEG_MAGIC:
+        header, image_format = _parse_jpeg_header(buf), "JPEG"
+    elif buf[:8] == PNG_MAGIC:
+        header, image_format = _parse_png_header(buf), "PNG"
+    else:
+        return None
+    return header + (image_format,) if header else None
+
+# Images are decoded in parallel across the batch, so keep OpenCV's own
+# thread pool from oversubscribing the cores
+cv2.setNumThreads(1)
+
+def _tile_offsets(length: int, tile: int, stride: int) -> list:
+    """Start offsets covering [0, length) with tiles, the last one flush with the end"""
+    offsets = list(range(0, length - tile, stride))
+    offsets.append(length - tile)
+    return offsets
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(name: str) -> ThreadPoolExecutor:
+    """Return the named process-wide thread pool, creating it once on first use"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = ThreadPoolExecutor(max_workers=os.cpu_count(),
+                                                         thread_name_prefix=name)
+    return pool
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Lazily create the process-wide thread pool shared by detection work
+    
+    Tasks running on this pool must not block on other tasks submitted to it.
+    preprocess_batch decodes on a separate pool, so it is safe to call from here.
+    """
+    return _get_pool("detection")
+
 class ImageProcessor:
     """Image preprocessing pipeline for leaf images"""
     
@@ -26,91 +136,237 @@ class ImageProcessor:
         Preprocess image for model input
         
         Args:
-            image_data: Image data (bytes, numpy array, or file path)
+            image_data: Image data (encoded bytes-like buffer, numpy array, or file path).
+                A 1-D uint8 array is treated as an encoded image buffer.
             
         Returns:
             Preprocessed image array normalized to [0, 1]
         """
         try:
-            # Load image based on input type
-            if isinstance(image_data, bytes):
-                image = self._load_from_bytes(image_data)
-            elif isinstance(image_data, str):
-                image = self._load_from_path(image_data)
-            elif isinstance(image_data, np.ndarray):
-                image = image_data.copy()
-            else:
-                raise ValueError(f"Unsupported image data type: {type(image_data)}")
-            
-            # Convert to PIL Image for processing
-            if isinstance(image, np.ndarray):
-                if image.dtype != np.uint8:
-                    image = (image * 255).astype(np.uint8)
-                pil_image = Image.fromarray(image)
-            else:
-                pil_image = image
-            
-            # Convert to RGB if needed
-            if pil_image.mode == 'RGBA':
-                pil_image = pil_image.convert('RGB')
-            elif pil_image.mode == 'L':  # Grayscale
-                pil_image = pil_image.convert('RGB')
-            elif pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
+            image = self._load_rgb(image_data)
             
             # Resize image
-            pil_image = pil_image.resize(self.target_size, Image.Resampling.LANCZOS)
-            
-            # Convert back to numpy array
-            image = np.array(pil_image)
+            image = cv2.resize(image, self.target_size, interpolation=cv2.INTER_AREA)
             
-            # Normalize to [0, 1]
-            image = image.astype(np.float32) / 255.0
+            return self._normalize_and_enhance(image)
             
-            # Apply preprocessing enhancements
-            image = self._enhance_image(image)
+        except Exception as e:
+            logger.error(f"Error preprocessing image: {e}")
+            raise ValueError(f"Failed to preprocess image: {e}")
+    
+    def preprocess_image_tiled(self, image_data: Union[bytes, np.ndarray, str],
+                               tile: int = 256, overlap: int = 32) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Preprocess a large image at full resolution as overlapping tiles
+        
+        Images smaller than a tile are padded by reflection. The last row and
+        column of tiles are aligned to the image edge, so every tile is full size.
+        
+        Args:
+            image_data: Image data (encoded bytes-like buffer, numpy array, or file path)
+            tile: Tile edge length in pixels
+            overlap: Pixels shared by neighbouring tiles
             
-            return image
+        Returns:
+            Iterator of (y, x, tile) with the tile's top-left offset and a view
+            into the preprocessed image normalized to [0, 1]
             
+        Raises:
+            ValueError: On an invalid overlap or unreadable image, at call time
+        """
+        if not 0 <= overlap < tile:
+            raise ValueError(f"Overlap must be in [0, {tile}), got {overlap}")
+        
+        try:
+            image = self._load_rgb(image_data, full_resolution=True)
+            height, width = image.shape[:2]
+            if height < tile or width < tile:
+                image = cv2.copyMakeBorder(image, 0, max(tile - height, 0), 0, max(tile - width, 0),
+                                           cv2.BORDER_REFLECT_101)
+            image = self._normalize_and_enhance(image)
         except Exception as e:
             logger.error(f"Error preprocessing image: {e}")
             raise ValueError(f"Failed to preprocess image: {e}")
+        
+        return self._iter_tiles(image, tile, tile - overlap)
+    
+    @staticmethod
+    def _iter_tiles(image: np.ndarray, tile: int, stride: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """Yield (y, x, view) for each tile of an image at least tile x tile in size"""
+        for y in _tile_offsets(image.shape[0], tile, stride):
+            for x in _tile_offsets(image.shape[1], tile, stride):
+                yield y, x, image[y:y + tile, x:x + tile]
     
-    def preprocess_batch(self, image_list: list) -> np.ndarray:
+    def stitch_tiles(self, tiles: Iterable[Tuple[int, int, np.ndarray]],
+                     image_shape: Tuple[int, ...], tile: int = 256) -> np.ndarray:
+        """
+        Blend per-tile model outputs (e.g. segmentation masks) into one full-size map
+        
+        Overlapping tiles are combined with a 2-D Hann window so seams fade out.
+        
+        Args:
+            tiles: (y, x, output) triples, each output tile x tile (x channels)
+            image_shape: Shape of the source image; only height and width are used
+            tile: Tile edge length used by preprocess_image_tiled
+            
+        Returns:
+            Stitched float32 array of shape (height, width, channels)
+        """
+        height, width = image_shape[:2]
+        canvas_shape = (max(height, tile), max(width, tile))
+        
+        # Drop the zero endpoints so border pixels covered by one tile keep a weight
+        hann = np.hanning(tile + 2)[1:-1].astype(np.float32)
+        window = np.outer(hann, hann)
+        
+        stitched = None
+        weights = np.zeros(canvas_shape, dtype=np.float32)
+        for y, x, output in tiles:
+            if output.ndim == 2:
+                output = output[..., np.newaxis]
+            if stitched is None:
+                stitched = np.zeros(canvas_shape + output.shape[2:], dtype=np.float32)
+            stitched[y:y + tile, x:x + tile] += output * window[..., np.newaxis]
+            weights[y:y + tile, x:x + tile] += window
+        
+        if stitched is None:
+            raise ValueError("No tiles to stitch")
+        
+        stitched /= np.maximum(weights, np.finfo(np.float32).tiny)[..., np.newaxis]
+        return stitched[:height, :width]
+    
+    def preprocess_batch(self, image_list: list, executor: Optional[Executor] = None) -> np.ndarray:
         """
         Preprocess batch of images
         
         Args:
             image_list: List of image data
+            executor: Executor to decode images on (defaults to a process-wide
+                decoding pool); the caller must not be running on it
             
         Returns:
             Batch of preprocessed images
         """
-        processed_images = []
+        executor = executor or _get_pool("decode")
+        futures = [executor.submit(self.preprocess_image, image_data) for image_data in image_list]
         
-        for image_data in image_list:
+        processed_images = None
+        successful_count = 0
+        
+        for future in futures:
             try:
-                processed_image = self.preprocess_image(image_data)
-                processed_images.append(processed_image)
+                processed_image = future.result()
             except Exception as e:
                 logger.warning(f"Failed to process image in batch: {e}")
                 # Skip failed images or add placeholder
                 continue
+            
+            if processed_images is None:
+                processed_images = np.empty((len(futures),) + processed_image.shape, dtype=np.float32)
+            processed_images[successful_count] = processed_image
+            successful_count += 1
         
-        if not processed_images:
+        if not successful_count:
             raise ValueError("No images could be processed in batch")
         
-        return np.array(processed_images)
+        return processed_images[:successful_count]
+    
+    def _load_rgb(self, image_data: Union[bytes, np.ndarray, str], full_resolution: bool = False) -> np.ndarray:
+        """
+        Load image data as an RGB uint8 array
+        
+        JPEGs may be downscaled during decode to just cover target_size unless
+        full_resolution is set; other inputs keep their original size.
+        """
+        # Load image based on input type
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            image = self._load_from_bytes(image_data, full_resolution)
+        elif isinstance(image_data, str):
+            image = np.asarray(self._load_from_path(image_data).convert('RGB'))
+        elif isinstance(image_data, np.ndarray) and image_data.ndim == 1:
+            # Flat uint8 buffer holding still-encoded image bytes
+            image = self._load_from_bytes(image_data, full_resolution)
+        elif isinstance(image_data, np.ndarray):
+            # Every later step writes to a new array, so the caller's buffer is only read
+            image = np.ascontiguousarray(image_data)
+        else:
+            raise ValueError(f"Unsupported image data type: {type(image_data)}")
+        
+        if image.dtype != np.uint8:
+            # Scale [0, 1] floats straight into a uint8 array, skipping the float temporary
+            scaled = np.empty(image.shape, dtype=np.uint8)
+            np.multiply(image, 255, out=scaled, casting='unsafe')
+            image = scaled
+        
+        # Convert to RGB if needed
+        if image.ndim == 2 or image.shape[2] == 1:  # Grayscale
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        elif image.shape[2] == 2:  # Grayscale + alpha
+            image = cv2.cvtColor(np.ascontiguousarray(image[..., 0]), cv2.COLOR_GRAY2RGB)
+        elif image.shape[2] == 4:  # RGBA
+            image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+        
+        return image
+    
+    def _normalize_and_enhance(self, image: np.ndarray) -> np.ndarray:
+        """Convert an RGB uint8 image to enhanced float32 values in [0, 1]"""
+        if NUMBA_AVAILABLE:
+            # Normalize and enhance in a single fused pass
+            enhanced = np.empty(image.shape, dtype=np.float32)
+            enhance_kernel(np.ascontiguousarray(image), enhanced)
+            return enhanced
+        
+        # Normalize to [0, 1]
+        image = image.astype(np.float32)
+        image *= 1.0 / 255.0
+        
+        # Apply preprocessing enhancements
+        self._enhance_inplace(image)
+        
+        return image
     
-    def _load_from_bytes(self, image_bytes: bytes) -> Image.Image:
-        """Load image from bytes"""
+    def _load_from_bytes(self, image_bytes: Union[bytes, bytearray, memoryview, np.ndarray],
+                         full_resolution: bool = False) -> np.ndarray:
+        """Decode an encoded image buffer into an RGB uint8 array without copying it"""
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            return image
+            buffer = np.frombuffer(image_bytes, np.uint8)
+            
+            if _turbojpeg is not None and buffer[:3].tobytes() == JPEG_MAGIC:
+                try:
+                    return self._decode_jpeg(buffer, full_resolution)
+                except Exception as e:
+                    # TurboJPEG cannot convert CMYK/YCCK JPEGs to RGB; OpenCV can
+                    logger.debug(f"TurboJPEG decode failed, falling back to OpenCV: {e}")
+            
+            # Keep pixels in stored order like PIL and TurboJPEG; OpenCV would
+            # otherwise apply the EXIF orientation
+            image = cv2.imdecode(buffer, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+            if image is None:
+                raise ValueError("Could not decode image bytes")
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         except Exception as e:
             logger.error(f"Failed to load image from bytes: {e}")
             raise
     
+    def _decode_jpeg(self, image_bytes: np.ndarray, full_resolution: bool = False) -> np.ndarray:
+        """Decode JPEG bytes with libjpeg-turbo, downscaling during decode unless full_resolution"""
+        if full_resolution:
+            return _turbojpeg.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=None)
+        
+        width, height, _, _ = _turbojpeg.decode_header(image_bytes)
+        target_width, target_height = self.target_size
+        
+        # Pick the smallest DCT scaling factor that still covers the target size
+        scaling_factor = None
+        for factor in ((1, 8), (1, 4), (1, 2)):
+            if (factor in _turbojpeg.scaling_factors
+                    and width * factor[0] // factor[1] >= target_width
+                    and height * factor[0] // factor[1] >= target_height):
+                scaling_factor = factor
+                break
+        
+        return _turbojpeg.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+    
     def _load_from_path(self, image_path: str) -> Image.Image:
         """Load image from file path"""
         try:
@@ -120,32 +376,20 @@ class ImageProcessor:
             logger.error(f"Failed to load image from path {image_path}: {e}")
             raise
     
-    def _enhance_image(self, image: np.ndarray) -> np.ndarray:
+    def _enhance_inplace(self, image: np.ndarray) -> None:
         """
         Apply image enhancements for better disease detection
         
         Args:
-            image: Normalized image array [0, 1]
-            
-        Returns:
-            Enhanced image array
+            image: Normalized float32 image array [0, 1], enhanced in place
         """
-        # Convert to PIL for enhancement
-        image_uint8 = (image * 255).astype(np.uint8)
-        pil_image = Image.fromarray(image_uint8)
-        
-        # Apply contrast enhancement
-        enhancer = ImageEnhance.Contrast(pil_image)
-        pil_image = enhancer.enhance(1.2)  # Increase contrast by 20%
+        # Apply contrast enhancement: (x - 0.5) * 1.2 + 0.5 in a single pass
+        cv2.addWeighted(image, 1.2, image, 0.0, -0.1, dst=image)  # Increase contrast by 20%
         
         # Apply sharpness enhancement
-        enhancer = ImageEnhance.Sharpness(pil_image)
-        pil_image = enhancer.enhance(1.1)  # Increase sharpness by 10%
+        cv2.filter2D(image, -1, _SHARPEN_KERNEL, dst=image)  # Increase sharpness by 10%
         
-        # Convert back to numpy array and normalize
-        enhanced = np.array(pil_image).astype(np.float32) / 255.0
-        
-        return enhanced
+        np.clip(image, 0.0, 1.0, out=image)
     
     def validate_image(self, image_data: Union[bytes, np.ndarray, str]) -> bool:
         """
@@ -161,12 +405,15 @@ class ImageProcessor:
             if isinstance(image_data, bytes):
                 if len(image_data) == 0:
                     return False
-                # Try to load and check basic properties
-                image = Image.open(io.BytesIO(image_data))
-                width, height = image.size
+                # Read dimensions from the header, loading with PIL only for other formats
+                header = _parse_image_header(image_data)
+                if header is not None:
+                    width, height = header[:2]
+                else:
+                    image = Image.open(io.BytesIO(image_data))
+                    width, height = image.size
                 
             elif isinstance(image_data, str):
-                import os
                 if not os.path.exists(image_data):
                     return False
                 image = Image.open(image_data)
@@ -215,18 +462,26 @@ class ImageProcessor:
         try:
             if isinstance(image_data, bytes):
                 metadata["size_bytes"] = len(image_data)
-                image = Image.open(io.BytesIO(image_data))
-                metadata["width"], metadata["height"] = image.size
-                metadata["format"] = image.format
-                metadata["channels"] = len(image.getbands())
+                header = _parse_image_header(image_data)
+                if header is None:
+                    image = Image.open(io.BytesIO(image_data))
                 
             elif isinstance(image_data, str):
-                import os
                 metadata["size_bytes"] = os.path.getsize(image_data)
-                image = Image.open(image_data)
-                metadata["width"], metadata["height"] = image.size
-                metadata["format"] = image.format
-                metadata["channels"] = len(image.getbands())
+                with open(image_data, 'rb') as f:
+                    header = _parse_image_header(f.read(HEADER_PREFIX_SIZE))
+                if header is None:
+                    image = Image.open(image_data)
+            
+            else:
+                header = image = None
+            
+            # Fall back to PIL for formats without a fast header parser
+            if header is None and image is not None:
+                header = image.size + (len(image.getbands()), image.format)
+            
+            if header is not None:
+                metadata["width"], metadata["height"], metadata["channels"], metadata["format"] = header
             
         except Exception as e:
             logger.warning(f"Failed to extract metadata: {e}")
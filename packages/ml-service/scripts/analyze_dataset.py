@@ -6,83 +6,193 @@ Analyzes the structure and contents of the dataset to inform integration
 
 import os
 import json
-from pathlib import Path
-from collections import defaultdict, Counter
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 
-def analyze_dataset_structure(dataset_path):
-    """Analyze the structure of the leaf disease segmentation dataset"""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Directory names that describe dataset layout rather than a disease class
+STOPWORDS = frozenset({'train', 'test', 'val', 'validation', 'images', 'masks', 'labels'})
+
+IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff'})
+ANNO_EXTS = frozenset({'.json', '.xml', '.txt', '.csv'})
+
+# File categories, stored as ints and named only when reported
+IMAGE, ANNOTATION, OTHER = 0, 1, 2
+_CATEGORY_NAMES = ('image', 'annotation', 'other')
+
+# Number of image/annotation paths kept as samples in the analysis
+SAMPLE_SIZE = 100
+
+# Directories listed concurrently while walking the dataset
+SCAN_WORKERS = 8
+
+# Number of files listed per directory in the verbose structure
+DIR_SAMPLE_SIZE = 5
+
+class FileInfo:
+    """Name, extension, size and category (IMAGE, ANNOTATION or OTHER) of a sampled file"""
+    __slots__ = ('name', 'ext', 'size', 'type')
+
+    def __init__(self, name, ext, size, type):
+        self.name = name
+        self.ext = ext
+        self.size = size
+        self.type = type
+
+    def to_dict(self):
+        return {"name": self.name, "extension": self.ext, "size": self.size,
+                "type": _CATEGORY_NAMES[self.type]}
+
+def _scan_dir(path, stat_files=False):
+    """List one directory, splitting it into subdirectory and file DirEntry objects
+
+    Symlinks are skipped. With stat_files, each file is stat()ed here so the
+    result is cached on its DirEntry before it reaches the caller. A directory
+    that cannot be listed is reported and treated as empty, as os.walk skips it.
+    """
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry)
+                else:
+                    if stat_files:
+                        entry.stat()
+                    files.append(entry)
+    except OSError as e:
+        print(f"⚠️  Skipping unreadable directory {path}: {e}")
+        return [], []
+    return dirs, files
+
+def _scandir_parallel(root, workers=SCAN_WORKERS, stat_files=False):
+    """Yield (path, subdirectory entries, file entries) for every directory under root
+
+    Directories are listed on a thread pool, which keeps several directory
+    reads in flight since scandir releases the GIL while blocked in the
+    kernel. Results are yielded breadth-first, in a deterministic order.
+    Closing the generator early cancels any scans still queued.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = deque([(root, executor.submit(_scan_dir, root, stat_files))])
+        while pending:
+            path, future = pending.popleft()
+            dirs, files = future.result()
+            for entry in dirs:
+                pending.append((entry.path, executor.submit(_scan_dir, entry.path, stat_files)))
+            yield path, dirs, files
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def _extension(name):
+    """Lowercased extension of a file name, matching os.path.splitext"""
+    stem, dot, ext = name.rpartition('.')
+    return dot + ext.lower() if stem.strip('.') else ''
+
+def _file_type(ext):
+    """Categorize a file by its extension as IMAGE, ANNOTATION or OTHER"""
+    if ext in IMAGE_EXTS:
+        return IMAGE
+    if ext in ANNO_EXTS:
+        return ANNOTATION
+    return OTHER
+
+def analyze_dataset_structure(dataset_path, verbose=False, workers=SCAN_WORKERS, max_files=None):
+    """Analyze the structure of the leaf disease segmentation dataset
+
+    The per-directory "structure" summary is only built when verbose is set.
+    With max_files, the walk stops once that many files have been counted.
+    """
     
-    dataset_path = Path(dataset_path)
-    if not dataset_path.exists():
+    dataset_path = os.path.normpath(dataset_path)
+    if not os.path.exists(dataset_path):
         print(f"❌ Dataset path does not exist: {dataset_path}")
         return None
     
     print(f"🔍 Analyzing dataset at: {dataset_path}")
     
     analysis = {
-        "dataset_path": str(dataset_path),
+        "dataset_path": dataset_path,
         "total_files": 0,
         "directories": [],
         "file_types": Counter(),
         "disease_classes": [],
+        "image_file_count": 0,
+        "annotation_file_count": 0,
         "image_files": [],
         "annotation_files": [],
         "structure": {}
     }
     
-    # Walk through the dataset directory
-    for root, dirs, files in os.walk(dataset_path):
-        rel_path = os.path.relpath(root, dataset_path)
+    disease_classes = set()
+    for dir_path, dir_entries, entries in _scandir_parallel(dataset_path, workers, stat_files=verbose):
+        # Stop early for a quick preview of large datasets
+        if max_files is not None:
+            remaining = max_files - analysis["total_files"]
+            if remaining <= 0:
+                print(f"⏹️  Stopped after {max_files} files (--max-files)")
+                break
+            entries = entries[:remaining]
+        
+        rel_path = os.path.relpath(dir_path, dataset_path)
         
         # Track directory structure
         if rel_path != ".":
             analysis["directories"].append(rel_path)
         
-        # Analyze files in current directory
-        dir_info = {
-            "path": rel_path,
-            "files": [],
-            "subdirs": dirs.copy()
-        }
+        # Directory names outside STOPWORDS may be disease classes
+        for entry in dir_entries:
+            if entry.name.lower() not in STOPWORDS:
+                disease_classes.add(entry.name)
+        
+        extensions = [_extension(entry.name) for entry in entries]
+        
+        # Tally the directory in bulk; Counter counts its input in C
+        ext_counts = Counter(extensions)
+        analysis["total_files"] += len(entries)
+        analysis["file_types"].update(ext_counts)
+        image_count = sum(ext_counts[ext] for ext in IMAGE_EXTS)
+        annotation_count = sum(ext_counts[ext] for ext in ANNO_EXTS)
+        analysis["image_file_count"] += image_count
+        analysis["annotation_file_count"] += annotation_count
         
-        for file in files:
-            file_path = Path(root) / file
-            file_ext = file_path.suffix.lower()
-            
-            analysis["total_files"] += 1
-            analysis["file_types"][file_ext] += 1
-            
-            file_info = {
-                "name": file,
-                "extension": file_ext,
-                "size": file_path.stat().st_size if file_path.exists() else 0
+        # Summarize the directory with aggregates and a few sample files
+        if verbose:
+            analysis["structure"][rel_path] = {
+                "path": rel_path,
+                "subdirs": [entry.name for entry in dir_entries],
+                "file_count": len(entries),
+                "total_size": sum(entry.stat().st_size for entry in entries),
+                "image_count": image_count,
+                "annotation_count": annotation_count,
+                "sample_files": [
+                    FileInfo(entry.name, file_ext, entry.stat().st_size, _file_type(file_ext))
+                    for entry, file_ext in zip(entries[:DIR_SAMPLE_SIZE], extensions)
+                ]
             }
-            
-            # Categorize files
-            if file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-                analysis["image_files"].append(str(file_path))
-                file_info["type"] = "image"
-            elif file_ext in ['.json', '.xml', '.txt', '.csv']:
-                analysis["annotation_files"].append(str(file_path))
-                file_info["type"] = "annotation"
-            else:
-                file_info["type"] = "other"
-            
-            dir_info["files"].append(file_info)
         
-        analysis["structure"][rel_path] = dir_info
-    
-    # Try to identify disease classes from directory structure
-    potential_classes = []
-    for dir_path in analysis["directories"]:
-        # Look for directories that might represent disease classes
-        parts = dir_path.split(os.sep)
-        for part in parts:
-            if part.lower() not in ['train', 'test', 'val', 'validation', 'images', 'masks', 'labels']:
-                potential_classes.append(part)
+        # Keep only the first SAMPLE_SIZE paths of each kind
+        if len(analysis["image_files"]) >= SAMPLE_SIZE \
+                and len(analysis["annotation_files"]) >= SAMPLE_SIZE:
+            continue
+        
+        for entry, file_ext in zip(entries, extensions):
+            if file_ext in IMAGE_EXTS:
+                if len(analysis["image_files"]) < SAMPLE_SIZE:
+                    analysis["image_files"].append(entry.path)
+            elif file_ext in ANNO_EXTS:
+                if len(analysis["annotation_files"]) < SAMPLE_SIZE:
+                    analysis["annotation_files"].append(entry.path)
     
-    analysis["disease_classes"] = list(set(potential_classes))
+    analysis["disease_classes"] = list(disease_classes)
     
     return analysis
 
@@ -97,8 +207,8 @@ def print_analysis_report(analysis):
     print(f"📈 Total Files: {analysis['total_files']}")
     print(f"📂 Total Directories: {len(analysis['directories'])}")
     
-    print(f"\n🖼️  Image Files: {len(analysis['image_files'])}")
-    print(f"📝 Annotation Files: {len(analysis['annotation_files'])}")
+    print(f"\n🖼️  Image Files: {analysis['image_file_count']}")
+    print(f"📝 Annotation Files: {analysis['annotation_file_count']}")
     
     print(f"\n📋 File Types:")
     for ext, count in analysis['file_types'].most_common():
@@ -111,6 +221,9 @@ def print_analysis_report(analysis):
     else:
         print("   No obvious disease classes detected from directory structure")
     
+    if not analysis['structure']:
+        return
+    
     print(f"\n📁 Directory Structure:")
     for path, info in analysis['structure'].items():
         if path == ".":
@@ -121,21 +234,18 @@ def print_analysis_report(analysis):
         if info['subdirs']:
             print(f"      Subdirectories: {', '.join(info['subdirs'])}")
         
-        image_count = sum(1 for f in info['files'] if f.get('type') == 'image')
-        annotation_count = sum(1 for f in info['files'] if f.get('type') == 'annotation')
+        if info['image_count'] > 0:
+            print(f"      Images: {info['image_count']}")
+        if info['annotation_count'] > 0:
+            print(f"      Annotations: {info['annotation_count']}")
         
-        if image_count > 0:
-            print(f"      Images: {image_count}")
-        if annotation_count > 0:
-            print(f"      Annotations: {annotation_count}")
-        
-        if len(info['files']) > 10:
-            print(f"      ... and {len(info['files']) - 10} more files")
-        elif info['files']:
-            for file_info in info['files'][:5]:  # Show first 5 files
-                print(f"      - {file_info['name']} ({file_info['type']})")
-            if len(info['files']) > 5:
-                print(f"      ... and {len(info['files']) - 5} more files")
+        if info['file_count'] > 10:
+            print(f"      ... and {info['file_count'] - 10} more files")
+        elif info['sample_files']:
+            for file_info in info['sample_files']:  # Show first 5 files
+                print(f"      - {file_info.name} ({_CATEGORY_NAMES[file_info.type]})")
+            if info['file_count'] > DIR_SAMPLE_SIZE:
+                print(f"      ... and {info['file_count'] - DIR_SAMPLE_SIZE} more files")
 
 def generate_integration_config(analysis):
     """Generate configuration for integrating the dataset"""
@@ -144,8 +254,8 @@ def generate_integration_config(analysis):
         "dataset_info": {
             "name": "leaf_disease_segmentation",
             "path": analysis["dataset_path"],
-            "total_images": len(analysis["image_files"]),
-            "total_annotations": len(analysis["annotation_files"]),
+            "total_images": analysis["image_file_count"],
+            "total_annotations": analysis["annotation_file_count"],
             "disease_classes": analysis["disease_classes"]
         },
         "preprocessing": {
@@ -163,15 +273,57 @@ def generate_integration_config(analysis):
     
     return config
 
+def _json_default(value):
+    """Encode values the JSON libraries do not handle natively"""
+    if isinstance(value, FileInfo):
+        return value.to_dict()
+    return str(value)
+
+def _dumps(value):
+    """Serialize a value to indented JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_INDENT_2)
+    return json.dumps(value, indent=2, default=_json_default).encode()
+
+def write_output(path, analysis, config):
+    """Write the analysis and config to a JSON file
+
+    Top-level keys, and each directory of the structure listing, are encoded
+    and written one at a time so the full document is never built in memory.
+    """
+    with open(path, 'wb') as f:
+        f.write(b'{"analysis": {')
+        for i, (key, value) in enumerate(analysis.items()):
+            f.write(b',\n' if i else b'\n')
+            f.write(_dumps(key) + b': ')
+            if key == "structure":
+                f.write(b'{')
+                for j, (rel_path, dir_info) in enumerate(value.items()):
+                    f.write(b',\n' if j else b'\n')
+                    f.write(_dumps(rel_path) + b': ' + _dumps(dir_info))
+                f.write(b'}')
+            else:
+                f.write(_dumps(value))
+        f.write(b'},\n"config": ')
+        f.write(_dumps(config))
+        f.write(b'}\n')
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze leaf disease segmentation dataset")
     parser.add_argument("dataset_path", help="Path to the dataset directory")
     parser.add_argument("--output", "-o", help="Output JSON file for analysis results")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Include the per-directory file listing in the report and output")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS,
+                        help="Number of directories to scan concurrently")
+    parser.add_argument("--max-files", type=int,
+                        help="Stop after analyzing this many files")
     
     args = parser.parse_args()
     
     # Analyze the dataset
-    analysis = analyze_dataset_structure(args.dataset_path)
+    analysis = analyze_dataset_structure(args.dataset_path, verbose=args.verbose,
+                                         workers=args.workers, max_files=args.max_files)
     
     if analysis is None:
         return 1
@@ -189,13 +341,7 @@ def main():
     
     # Save results if requested
     if args.output:
-        output_data = {
-            "analysis": analysis,
-            "config": config
-        }
-        
-        with open(args.output, 'w') as f:
-            json.dump(output_data, f, indent=2, default=str)
+        write_output(args.output, analysis, config)
         
         print(f"\n💾 Analysis saved to: {args.output}")
     
@@ -0,0 +1,210 @@
+import pytest
+import io
+import os
+import numpy as np
+import cv2
+from PIL import Image
+
+from preprocessing._kernels import NUMBA_AVAILABLE, enhance_kernel
+from preprocessing import image_processor
+from preprocessing.image_processor import ImageProcessor, _parse_image_header, _tile_offsets, get_executor
+
+@pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed")
+@pytest.mark.parametrize("shape", [(1, 1, 3), (2, 5, 3), (37, 64, 3), (64, 37, 1)])
+def test_enhance_kernel_matches_opencv_path(shape):
+    """The fused Numba kernel should match normalize + _enhance_inplace"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=shape, dtype=np.uint8)
+
+    fused = np.empty(shape, dtype=np.float32)
+    enhance_kernel(image, fused)
+
+    expected = image.astype(np.float32) / 255.0
+    ImageProcessor()._enhance_inplace(expected)
+
+    np.testing.assert_allclose(fused, expected.reshape(shape), atol=1e-5)
+
+def test_preprocess_batch_from_detection_pool():
+    """Detection tasks filling the shared pool can still decode batches"""
+    processor = ImageProcessor()
+    images = [cv2.imencode('.png', np.full((40, 40, 3), i, np.uint8))[1].tobytes() for i in range(4)]
+
+    executor = get_executor()
+    futures = [executor.submit(processor.preprocess_batch, images) for _ in range(2 * os.cpu_count())]
+
+    for future in futures:
+        assert future.result(timeout=30).shape == (4, 256, 256, 3)
+
+@pytest.mark.parametrize("shape", [(40, 30), (40, 30, 1), (40, 30, 2), (40, 30, 3), (40, 30, 4)])
+def test_preprocess_image_outputs_rgb(shape):
+    """Grayscale, gray+alpha and RGBA arrays are converted to 3-channel RGB"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    processor = ImageProcessor()
+
+    assert processor.preprocess_image(image).shape == (256, 256, 3)
+
+    # Alpha is dropped, so the colour comes from the gray/RGB channels alone
+    rgb = processor._load_rgb(image)
+    np.testing.assert_array_equal(rgb[..., 0], image if image.ndim == 2 else image[..., 0])
+
+def _encode(mode, image_format, size=(67, 45), **params):
+    """Encode a solid test image with PIL"""
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+def _exif_jpeg():
+    """JPEG whose APP1/EXIF segment precedes the SOF marker"""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "camera" * 200
+    return _encode('RGB', 'JPEG', exif=exif.tobytes())
+
+HEADER_CASES = {
+    "jpeg-rgb": lambda: _encode('RGB', 'JPEG'),
+    "jpeg-gray": lambda: _encode('L', 'JPEG'),
+    "jpeg-cmyk": lambda: _encode('CMYK', 'JPEG'),
+    "jpeg-progressive": lambda: _encode('RGB', 'JPEG', progressive=True),
+    "jpeg-exif": _exif_jpeg,
+    "png-rgb": lambda: _encode('RGB', 'PNG'),
+    "png-l": lambda: _encode('L', 'PNG'),
+    "png-la": lambda: _encode('LA', 'PNG'),
+    "png-p": lambda: _encode('P', 'PNG'),
+    "png-16bit": lambda: _encode('I;16', 'PNG'),
+    "png-rgba": lambda: _encode('RGBA', 'PNG'),
+}
+
+def _pil_header(image_bytes):
+    image = Image.open(io.BytesIO(image_bytes))
+    return image.size + (len(image.getbands()), image.format)
+
+@pytest.mark.parametrize("case", HEADER_CASES)
+def test_parse_image_header_matches_pil(case):
+    """The hand-written JPEG/PNG parsers should agree with PIL"""
+    image_bytes = HEADER_CASES[case]()
+    assert _parse_image_header(image_bytes) == _pil_header(image_bytes)
+
+@pytest.mark.parametrize("case", HEADER_CASES)
+def test_extract_metadata_matches_pil(case, tmp_path):
+    """Metadata from bytes and from a file path should match PIL"""
+    image_bytes = HEADER_CASES[case]()
+    width, height, channels, image_format = _pil_header(image_bytes)
+    expected = {"width": width, "height": height, "channels": channels,
+                "format": image_format, "size_bytes": len(image_bytes)}
+
+    path = tmp_path / "image"
+    path.write_bytes(image_bytes)
+
+    processor = ImageProcessor()
+    assert processor.extract_metadata(image_bytes) == expected
+    assert processor.extract_metadata(str(path)) == expected
+
+@pytest.mark.parametrize("image_bytes", [
+    _exif_jpeg()[:200],                   # Cut off before the SOF segment
+    _encode('RGB', 'PNG')[:20],           # Cut off inside IHDR
+    b'\xff\xd8\xff' + b'\x00' * 64,   # JPEG magic followed by garbage
+    bytes(range(256)),
+])
+def test_unparseable_headers_fall_back_to_pil(image_bytes):
+    """Truncated or garbage buffers are left to PIL, which rejects them"""
+    assert _parse_image_header(image_bytes) is None
+
+    metadata = ImageProcessor().extract_metadata(image_bytes)
+    assert metadata["size_bytes"] == len(image_bytes)
+    assert metadata["width"] is None and metadata["format"] is None
+
+def test_other_formats_use_pil_metadata():
+    """Formats without a header parser are read through PIL"""
+    image_bytes = _encode('RGB', 'GIF')
+    assert _parse_image_header(image_bytes) is None
+
+    metadata = ImageProcessor().extract_metadata(image_bytes)
+    assert (metadata["width"], metadata["height"], metadata["channels"], metadata["format"]) == \
+        _pil_header(image_bytes)
+
+@pytest.mark.parametrize("length, tile, stride, expected", [
+    (256, 256, 224, [0]),
+    (480, 256, 224, [0, 224]),
+    (500, 256, 224, [0, 224, 244]),
+    (1000, 256, 256, [0, 256, 512, 744]),
+])
+def test_tile_offsets(length, tile, stride, expected):
+    """Tiles start at 0, advance by at most stride and end flush with the edge"""
+    assert _tile_offsets(length, tile, stride) == expected
+
+@pytest.mark.parametrize("shape", [(300, 520, 3), (100, 150, 3), (256, 256, 3)])
+def test_stitched_tiles_reproduce_preprocessed_image(shape):
+    """Stitching the input tiles back together gives the full preprocessed image"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    processor = ImageProcessor()
+
+    stitched = processor.stitch_tiles(processor.preprocess_image_tiled(image), image.shape)
+
+    # Small images are reflection-padded to a tile; the padding is cropped away again
+    padded = cv2.copyMakeBorder(image, 0, max(256 - shape[0], 0), 0, max(256 - shape[1], 0),
+                                cv2.BORDER_REFLECT_101)
+    expected = processor._normalize_and_enhance(padded)[:shape[0], :shape[1]]
+    np.testing.assert_allclose(stitched, expected, atol=1e-5)
+
+def test_tiled_overlap_validated_on_call():
+    """An invalid overlap raises before any tile is requested"""
+    with pytest.raises(ValueError):
+        ImageProcessor().preprocess_image_tiled(np.zeros((64, 64, 3), np.uint8), tile=64, overlap=64)
+
+class _ScalingJPEGDecoder:
+    """Stand-in for TurboJPEG that honours scaling_factor like libjpeg-turbo"""
+    scaling_factors = frozenset({(1, 8), (1, 4), (1, 2), (1, 1)})
+
+    def decode_header(self, image_bytes):
+        height, width = cv2.imdecode(image_bytes, cv2.IMREAD_COLOR).shape[:2]
+        return width, height, 0, 0
+
+    def decode(self, image_bytes, pixel_format=None, scaling_factor=None):
+        image = cv2.cvtColor(cv2.imdecode(image_bytes, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+        if scaling_factor is not None:
+            num, denom = scaling_factor
+            size = (image.shape[1] * num // denom, image.shape[0] * num // denom)
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image
+
+def test_tiled_jpeg_decodes_at_full_resolution(monkeypatch):
+    """The tiled path must not take the DCT-downscaled JPEG decode"""
+    monkeypatch.setattr(image_processor, "_turbojpeg", _ScalingJPEGDecoder())
+    monkeypatch.setattr(image_processor, "TJPF_RGB", 0, raising=False)
+    jpeg = cv2.imencode('.jpg', np.zeros((1024, 2048, 3), np.uint8))[1].tobytes()
+    processor = ImageProcessor()
+
+    # The single-image path downscales during decode...
+    assert processor._load_rgb(jpeg).shape == (256, 512, 3)
+
+    # ...the tiled path covers every source pixel
+    offsets = [(y, x) for y, x, _ in processor.preprocess_image_tiled(jpeg)]
+    assert len(offsets) == len(_tile_offsets(1024, 256, 224)) * len(_tile_offsets(2048, 256, 224))
+    assert max(offsets) == (1024 - 256, 2048 - 256)
+
+@pytest.mark.skipif(image_processor._turbojpeg is None, reason="TurboJPEG is not installed")
+def test_cmyk_jpeg_decodes_with_turbojpeg_installed():
+    """CMYK JPEGs, which TurboJPEG cannot convert to RGB, still decode"""
+    cmyk = _encode('CMYK', 'JPEG', size=(300, 200))
+
+    assert ImageProcessor().preprocess_image(cmyk).shape == (256, 256, 3)
+
+class _RGBOnlyJPEGDecoder(_ScalingJPEGDecoder):
+    """Stand-in for TurboJPEG rejecting non-YCbCr JPEGs the way libjpeg-turbo does"""
+
+    def decode(self, image_bytes, pixel_format=None, scaling_factor=None):
+        if Image.open(io.BytesIO(image_bytes.tobytes())).mode == 'CMYK':
+            raise OSError("Unsupported color conversion request")
+        return super().decode(image_bytes, pixel_format, scaling_factor)
+
+def test_cmyk_jpeg_falls_back_to_opencv(monkeypatch):
+    """A TurboJPEG decode failure falls through to OpenCV's decoder"""
+    monkeypatch.setattr(image_processor, "_turbojpeg", _RGBOnlyJPEGDecoder())
+    monkeypatch.setattr(image_processor, "TJPF_RGB", 0, raising=False)
+    cmyk = _encode('CMYK', 'JPEG', size=(300, 200))
+    processor = ImageProcessor()
+
+    assert processor._load_rgb(cmyk).shape == (200, 300, 3)
+    assert processor.preprocess_image(cmyk).shape == (256, 256, 3)
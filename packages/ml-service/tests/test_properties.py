@@ -4,12 +4,26 @@ import numpy as np
 from PIL import Image
 import io
 import asyncio
+from functools import lru_cache
 from unittest.mock import patch, MagicMock
 
 from services.detection_service import DiseaseDetectionService, DetectionResult
 from models.unet import UNetModel
 from preprocessing.image_processor import ImageProcessor
 
+@pytest.fixture(scope="module")
+def event_loop():
+    """One event loop shared by every Hypothesis example in this module"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="session")
+def detection_service():
+    """Detection service shared by the whole session so the model loads once"""
+    return DiseaseDetectionService()
+
 # Test data generators
 @st.composite
 def valid_image_data(draw):
@@ -18,22 +32,35 @@ def valid_image_data(draw):
     width = draw(st.integers(min_value=64, max_value=512))
     height = draw(st.integers(min_value=64, max_value=512))
     
-    # Generate random RGB values
-    image_array = draw(st.lists(
-        st.integers(min_value=0, max_value=255),
-        min_size=width * height * 3,
-        max_size=width * height * 3
-    ))
+    # Generate random RGB values in a single draw; Hypothesis caps the data
+    # drawn per example, so a short buffer is repeated across the image
+    raw = draw(st.binary(min_size=3, max_size=4096))
     
     # Convert to PIL Image and then to bytes
-    image_array = np.array(image_array, dtype=np.uint8).reshape((height, width, 3))
+    image_array = np.resize(np.frombuffer(raw, dtype=np.uint8), (height, width, 3))
     image = Image.fromarray(image_array, 'RGB')
     
-    # Convert to bytes
+    # Convert to bytes; BMP skips PNG's DEFLATE pass and decodes just as well
     img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')
+    image.save(img_byte_arr, format='BMP')
     return img_byte_arr.getvalue()
 
+TINY_IMAGE_SIZE = 64
+
+@lru_cache(maxsize=32)
+def _encode_tiny_image(raw):
+    """Encode raw pixel bytes as a TINY_IMAGE_SIZE square BMP
+
+    Memoized because Hypothesis replays the same examples while shrinking.
+    """
+    image_array = np.resize(np.frombuffer(raw, dtype=np.uint8), (TINY_IMAGE_SIZE, TINY_IMAGE_SIZE, 3))
+    img_byte_arr = io.BytesIO()
+    Image.fromarray(image_array, 'RGB').save(img_byte_arr, format='BMP')
+    return img_byte_arr.getvalue()
+
+# Fixed-size images for properties that do not depend on resolution
+tiny_image_data = st.builds(_encode_tiny_image, st.binary(min_size=3, max_size=4096))
+
 @st.composite
 def batch_image_data(draw):
     """Generate batch of valid image data"""
@@ -46,82 +73,72 @@ class TestDetectionResultStructure:
     **Validates: Requirements 1.3, 2.1, 2.2**
     """
     
-    @given(valid_image_data())
-    def test_detection_result_contains_required_structure(self, image_data):
+    @given(tiny_image_data)
+    def test_detection_result_contains_required_structure(self, event_loop, detection_service, image_data):
         """
         Property: For any completed image analysis, the result should contain disease 
         identifications with confidence percentages and visual highlighting data when diseases are present
         """
-        # Create detection service
-        service = DiseaseDetectionService()
+        # Run detection synchronously on the shared loop
+        result = event_loop.run_until_complete(detection_service.detect_disease(image_data))
         
-        # Run detection synchronously for testing
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Verify result structure
+        assert isinstance(result, DetectionResult)
+        assert hasattr(result, 'detection_id')
+        assert hasattr(result, 'diseases')
+        assert hasattr(result, 'confidence')
+        assert hasattr(result, 'segmentation_mask')
+        assert hasattr(result, 'processing_time')
+        assert hasattr(result, 'metadata')
+        assert hasattr(result, 'timestamp')
         
-        try:
-            result = loop.run_until_complete(service.detect_disease(image_data))
-            
-            # Verify result structure
-            assert isinstance(result, DetectionResult)
-            assert hasattr(result, 'detection_id')
-            assert hasattr(result, 'diseases')
-            assert hasattr(result, 'confidence')
-            assert hasattr(result, 'segmentation_mask')
-            assert hasattr(result, 'processing_time')
-            assert hasattr(result, 'metadata')
-            assert hasattr(result, 'timestamp')
-            
-            # Verify detection_id is not empty
-            assert result.detection_id is not None
-            assert len(result.detection_id) > 0
-            
-            # Verify diseases structure
-            assert isinstance(result.diseases, list)
-            for disease in result.diseases:
-                assert isinstance(disease, dict)
-                assert 'name' in disease
-                assert 'confidence' in disease
-                assert 'rank' in disease
-                assert 'treatment_recommendations' in disease
-                assert 'requires_expert_verification' in disease
-                
-                # Verify confidence is a valid percentage
-                assert isinstance(disease['confidence'], (int, float))
-                assert 0.0 <= disease['confidence'] <= 1.0
-                
-                # Verify treatment recommendations exist
-                assert isinstance(disease['treatment_recommendations'], list)
-                assert len(disease['treatment_recommendations']) > 0
-            
-            # Verify overall confidence
-            assert isinstance(result.confidence, (int, float))
-            assert 0.0 <= result.confidence <= 1.0
-            
-            # Verify processing time is positive
-            assert isinstance(result.processing_time, (int, float))
-            assert result.processing_time >= 0.0
-            
-            # Verify metadata structure
-            assert isinstance(result.metadata, dict)
-            
-            # Verify timestamp format
-            assert isinstance(result.timestamp, str)
-            assert len(result.timestamp) > 0
+        # Verify detection_id is not empty
+        assert result.detection_id is not None
+        assert len(result.detection_id) > 0
+        
+        # Verify diseases structure
+        assert isinstance(result.diseases, list)
+        for disease in result.diseases:
+            assert isinstance(disease, dict)
+            assert 'name' in disease
+            assert 'confidence' in disease
+            assert 'rank' in disease
+            assert 'treatment_recommendations' in disease
+            assert 'requires_expert_verification' in disease
             
-            # Verify to_dict method works
-            result_dict = result.to_dict()
-            assert isinstance(result_dict, dict)
-            assert 'detection_id' in result_dict
-            assert 'diseases' in result_dict
-            assert 'confidence' in result_dict
-            assert 'processing_time' in result_dict
-            assert 'timestamp' in result_dict
-            assert 'metadata' in result_dict
-            assert 'has_segmentation' in result_dict
+            # Verify confidence is a valid percentage
+            assert isinstance(disease['confidence'], (int, float))
+            assert 0.0 <= disease['confidence'] <= 1.0
             
-        finally:
-            loop.close()
+            # Verify treatment recommendations exist
+            assert isinstance(disease['treatment_recommendations'], list)
+            assert len(disease['treatment_recommendations']) > 0
+        
+        # Verify overall confidence
+        assert isinstance(result.confidence, (int, float))
+        assert 0.0 <= result.confidence <= 1.0
+        
+        # Verify processing time is positive
+        assert isinstance(result.processing_time, (int, float))
+        assert result.processing_time >= 0.0
+        
+        # Verify metadata structure
+        assert isinstance(result.metadata, dict)
+        
+        # Verify timestamp format
+        assert isinstance(result.timestamp, str)
+        assert len(result.timestamp) > 0
+        
+        # Verify to_dict method works
+        result_dict = result.to_dict()
+        assert isinstance(result_dict, dict)
+        assert 'detection_id' in result_dict
+        assert 'diseases' in result_dict
+        assert 'confidence' in result_dict
+        assert 'processing_time' in result_dict
+        assert 'timestamp' in result_dict
+        assert 'metadata' in result_dict
+        assert 'has_segmentation' in result_dict
 
 class TestBatchProcessingIndependence:
     """
@@ -130,56 +147,46 @@ class TestBatchProcessingIndependence:
     """
     
     @given(batch_image_data())
-    def test_batch_processing_independence(self, image_list):
+    def test_batch_processing_independence(self, event_loop, detection_service, image_list):
         """
         Property: For any set of images processed simultaneously, each image should 
         produce the same result as if processed individually
         """
         assume(len(image_list) >= 2)  # Need at least 2 images for meaningful test
         
-        service = DiseaseDetectionService()
+        # Process images individually, gathered concurrently (gather keeps input order)
+        individual_results = event_loop.run_until_complete(
+            asyncio.gather(*(detection_service.detect_disease(image_data) for image_data in image_list))
+        )
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Process images as batch
+        batch_results = event_loop.run_until_complete(detection_service.detect_diseases_batch(image_list))
         
-        try:
-            # Process images individually
-            individual_results = []
-            for image_data in image_list:
-                result = loop.run_until_complete(service.detect_disease(image_data))
-                individual_results.append(result)
-            
-            # Process images as batch
-            batch_results = loop.run_until_complete(service.detect_diseases_batch(image_list))
-            
-            # Verify same number of results
-            assert len(individual_results) == len(batch_results)
-            assert len(batch_results) == len(image_list)
+        # Verify same number of results
+        assert len(individual_results) == len(batch_results)
+        assert len(batch_results) == len(image_list)
+        
+        # Compare results (allowing for small numerical differences due to batch processing)
+        for individual, batch in zip(individual_results, batch_results):
+            # Both should have same disease structure
+            assert len(individual.diseases) == len(batch.diseases)
             
-            # Compare results (allowing for small numerical differences due to batch processing)
-            for individual, batch in zip(individual_results, batch_results):
-                # Both should have same disease structure
-                assert len(individual.diseases) == len(batch.diseases)
+            # Compare disease names and relative confidences
+            if individual.diseases and batch.diseases:
+                # Top (rank 1) disease should be the same; diseases are returned in rank order
+                individual_top = individual.diseases[0]
+                batch_top = batch.diseases[0]
                 
-                # Compare disease names and relative confidences
-                if individual.diseases and batch.diseases:
-                    # Top disease should be the same
-                    individual_top = max(individual.diseases, key=lambda d: d['confidence'])
-                    batch_top = max(batch.diseases, key=lambda d: d['confidence'])
-                    
-                    assert individual_top['name'] == batch_top['name']
-                    
-                    # Confidence should be similar (within 10% tolerance for batch processing differences)
-                    confidence_diff = abs(individual_top['confidence'] - batch_top['confidence'])
-                    assert confidence_diff <= 0.1
+                assert individual_top['name'] == batch_top['name']
                 
-                # Both should have valid structure
-                assert isinstance(individual.detection_id, str)
-                assert isinstance(batch.detection_id, str)
-                assert individual.detection_id != batch.detection_id  # Should have different IDs
-                
-        finally:
-            loop.close()
+                # Confidence should be similar (within 10% tolerance for batch processing differences)
+                confidence_diff = abs(individual_top['confidence'] - batch_top['confidence'])
+                assert confidence_diff <= 0.1
+            
+            # Both should have valid structure
+            assert isinstance(individual.detection_id, str)
+            assert isinstance(batch.detection_id, str)
+            assert individual.detection_id != batch.detection_id  # Should have different IDs
 
 class TestHealthyStatusDetection:
     """
@@ -187,16 +194,14 @@ class TestHealthyStatusDetection:
     **Validates: Requirements 2.4**
     """
     
-    @given(valid_image_data())
-    def test_healthy_status_for_low_confidence(self, image_data):
+    @given(tiny_image_data)
+    def test_healthy_status_for_low_confidence(self, event_loop, detection_service, image_data):
         """
         Property: For any analysis where no disease confidence exceeds the detection threshold, 
         the system should return a healthy leaf status
         """
-        service = DiseaseDetectionService()
-        
         # Mock the model to return low confidence results
-        with patch.object(service.model, 'predict') as mock_predict:
+        with patch.object(detection_service.model, 'predict') as mock_predict:
             # Create low confidence classification (all diseases below threshold)
             low_confidence_classification = np.array([0.6, 0.2, 0.1, 0.05, 0.05])  # healthy=0.6, others low
             mock_segmentation = np.zeros((256, 256, 1))
@@ -204,29 +209,22 @@ class TestHealthyStatusDetection:
             
             mock_predict.return_value = (mock_segmentation, low_confidence_classification, mock_confidence)
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            result = event_loop.run_until_complete(detection_service.detect_disease(image_data))
             
-            try:
-                result = loop.run_until_complete(service.detect_disease(image_data))
-                
-                # Should have diseases list
-                assert isinstance(result.diseases, list)
-                assert len(result.diseases) > 0
-                
-                # Should contain healthy status when confidence is low
-                healthy_diseases = [d for d in result.diseases if d['name'] == 'healthy']
-                assert len(healthy_diseases) > 0
-                
-                # Healthy should be ranked high when other confidences are low
-                healthy_disease = healthy_diseases[0]
-                assert healthy_disease['rank'] <= 2  # Should be top 2
-                
-                # Overall confidence should reflect the low confidence
-                assert result.confidence <= service.confidence_threshold
-                
-            finally:
-                loop.close()
+            # Should have diseases list
+            assert isinstance(result.diseases, list)
+            assert len(result.diseases) > 0
+            
+            # Should contain healthy status when confidence is low
+            healthy_diseases = [d for d in result.diseases if d['name'] == 'healthy']
+            assert len(healthy_diseases) > 0
+            
+            # Healthy should be ranked high when other confidences are low
+            healthy_disease = healthy_diseases[0]
+            assert healthy_disease['rank'] <= 2  # Should be top 2
+            
+            # Overall confidence should reflect the low confidence
+            assert result.confidence <= detection_service.confidence_threshold
 
 class TestTreatmentRecommendations:
     """
@@ -234,56 +232,45 @@ class TestTreatmentRecommendations:
     **Validates: Requirements 2.3**
     """
     
-    @given(valid_image_data())
-    def test_treatment_recommendations_accompany_disease_detection(self, image_data):
+    @given(tiny_image_data)
+    def test_treatment_recommendations_accompany_disease_detection(self, event_loop, detection_service, image_data):
         """
         Property: For any disease identification result, the system should provide 
         corresponding treatment recommendations
         """
-        service = DiseaseDetectionService()
+        result = event_loop.run_until_complete(detection_service.detect_disease(image_data))
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Verify result has diseases
+        assert isinstance(result.diseases, list)
+        assert len(result.diseases) > 0
         
-        try:
-            result = loop.run_until_complete(service.detect_disease(image_data))
-            
-            # Verify result has diseases
-            assert isinstance(result.diseases, list)
-            assert len(result.diseases) > 0
-            
-            # Every disease should have treatment recommendations
-            for disease in result.diseases:
-                assert 'treatment_recommendations' in disease
-                assert isinstance(disease['treatment_recommendations'], list)
-                assert len(disease['treatment_recommendations']) > 0
-                
-                # Each treatment recommendation should be a non-empty string
-                for treatment in disease['treatment_recommendations']:
-                    assert isinstance(treatment, str)
-                    assert len(treatment.strip()) > 0
-                
-                # Verify disease has required fields for treatment context
-                assert 'name' in disease
-                assert 'confidence' in disease
-                assert isinstance(disease['name'], str)
-                assert len(disease['name']) > 0
+        # Every disease should have treatment recommendations
+        for disease in result.diseases:
+            assert 'treatment_recommendations' in disease
+            assert isinstance(disease['treatment_recommendations'], list)
+            assert len(disease['treatment_recommendations']) > 0
             
-            # Test specific disease scenarios with mocked results
+            # Each treatment recommendation should be a non-empty string
+            for treatment in disease['treatment_recommendations']:
+                assert isinstance(treatment, str)
+                assert len(treatment.strip()) > 0
             
-        finally:
-            loop.close()
+            # Verify disease has required fields for treatment context
+            assert 'name' in disease
+            assert 'confidence' in disease
+            assert isinstance(disease['name'], str)
+            assert len(disease['name']) > 0
+        
+        # Test specific disease scenarios with mocked results
     
     @given(st.sampled_from(['healthy', 'bacterial_blight', 'leaf_spot', 'rust', 'powdery_mildew', 'unknown_disease']))
-    def test_treatment_recommendations_for_specific_diseases(self, disease_name):
+    def test_treatment_recommendations_for_specific_diseases(self, detection_service, disease_name):
         """
         Property: For any identified disease type, appropriate treatment recommendations 
         should be provided based on the disease characteristics
         """
-        service = DiseaseDetectionService()
-        
         # Get treatment recommendations directly
-        treatments = service._get_treatment_recommendations(disease_name)
+        treatments = detection_service._get_treatment_recommendations(disease_name)
         
         # Verify treatments structure
         assert isinstance(treatments, list)
@@ -315,16 +302,14 @@ class TestLowConfidenceFlagging:
     **Validates: Requirements 2.5**
     """
     
-    @given(valid_image_data())
-    def test_low_confidence_flagging(self, image_data):
+    @given(tiny_image_data)
+    def test_low_confidence_flagging(self, event_loop, detection_service, image_data):
         """
         Property: For any detection result with confidence below 70%, the system should 
         flag it as requiring expert verification
         """
-        service = DiseaseDetectionService()
-        
         # Test with low confidence scenario
-        with patch.object(service.model, 'predict') as mock_predict:
+        with patch.object(detection_service.model, 'predict') as mock_predict:
             # Create classification with low confidence
             low_confidence_classification = np.array([0.1, 0.5, 0.2, 0.1, 0.1])  # bacterial_blight=0.5 (below 0.7)
             mock_segmentation = np.zeros((256, 256, 1))
@@ -332,30 +317,23 @@ class TestLowConfidenceFlagging:
             
             mock_predict.return_value = (mock_segmentation, low_confidence_classification, mock_confidence)
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            result = event_loop.run_until_complete(detection_service.detect_disease(image_data))
             
-            try:
-                result = loop.run_until_complete(service.detect_disease(image_data))
-                
-                # Should have diseases
-                assert len(result.diseases) > 0
-                
-                # All diseases with confidence below threshold should be flagged
-                for disease in result.diseases:
-                    if disease['confidence'] < service.low_confidence_threshold:
-                        assert disease['requires_expert_verification'] is True
-                    else:
-                        assert disease['requires_expert_verification'] is False
-                
-                # Overall result confidence should be below threshold
-                assert result.confidence < service.low_confidence_threshold
-                
-            finally:
-                loop.close()
+            # Should have diseases
+            assert len(result.diseases) > 0
+            
+            # All diseases with confidence below threshold should be flagged
+            for disease in result.diseases:
+                if disease['confidence'] < detection_service.low_confidence_threshold:
+                    assert disease['requires_expert_verification'] is True
+                else:
+                    assert disease['requires_expert_verification'] is False
+            
+            # Overall result confidence should be below threshold
+            assert result.confidence < detection_service.low_confidence_threshold
         
         # Test with high confidence scenario
-        with patch.object(service.model, 'predict') as mock_predict:
+        with patch.object(detection_service.model, 'predict') as mock_predict:
             # Create classification with high confidence
             high_confidence_classification = np.array([0.05, 0.85, 0.05, 0.025, 0.025])  # bacterial_blight=0.85
             mock_segmentation = np.zeros((256, 256, 1))
@@ -363,22 +341,15 @@ class TestLowConfidenceFlagging:
             
             mock_predict.return_value = (mock_segmentation, high_confidence_classification, mock_confidence)
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            result = event_loop.run_until_complete(detection_service.detect_disease(image_data))
             
-            try:
-                result = loop.run_until_complete(service.detect_disease(image_data))
-                
-                # Should have diseases
-                assert len(result.diseases) > 0
-                
-                # High confidence diseases should not be flagged
-                top_disease = max(result.diseases, key=lambda d: d['confidence'])
-                if top_disease['confidence'] >= service.low_confidence_threshold:
-                    assert top_disease['requires_expert_verification'] is False
-                
-            finally:
-                loop.close()
+            # Should have diseases
+            assert len(result.diseases) > 0
+            
+            # High confidence diseases should not be flagged
+            top_disease = max(result.diseases, key=lambda d: d['confidence'])
+            if top_disease['confidence'] >= detection_service.low_confidence_threshold:
+                assert top_disease['requires_expert_verification'] is False
 
 # Example property-based test setup for ML service
 class TestPropertyExamples: